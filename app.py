@@ -1,19 +1,69 @@
+import atexit
+import functools
+import heapq
+import itertools
 import json
 import logging
+import os
+import threading
 import uuid
-from datetime import datetime, timezone, timedelta, time
+from datetime import date, datetime, timezone, timedelta, time
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
-from croniter import croniter
-from flask import Flask, jsonify, redirect, render_template, request, url_for
-from zoneinfo import ZoneInfo
+from croniter import croniter, croniter_range
+from flask import Flask, Response, redirect, render_template, request, url_for
+from zoneinfo import ZoneInfo, available_timezones
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup; fall back to stdlib json
+    orjson = None
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).parent
 DATA_FILE = BASE_DIR / "data" / "state.json"
+# Round-robin counters live apart from state.json so /api/shift only rewrites a tiny file
+RR_FILE = BASE_DIR / "data" / "rr.json"
+
+# Guards inserts and evictions in the small FIFO caches below (_fifo_cache_put)
+_fifo_cache_lock = threading.Lock()
+# Recent current-shift scans (_scan_current_shift), keyed by (state.json signature, whole second)
+_shift_cache: Dict[Tuple[Tuple[int, int, int], int], Tuple] = {}
+SHIFT_CACHE_SIZE = 4
+# Serialized /api/timeline bodies, keyed by (tz name, window start, window end, granularity, state.json signature)
+_timeline_cache: Dict[Tuple, bytes] = {}
+TIMELINE_CACHE_SIZE = 16
+# Slot sizes (minutes) /api/timeline may snap segment boundaries to
+TIMELINE_GRANULARITIES = (1, 5, 15, 60)
+_GRANULARITY_HELP = ", ".join(str(g) for g in TIMELINE_GRANULARITIES)
+# Last next-start lookup as (state.json signature, computed_at, schedule, start_utc); it stays the
+# answer until start_utc passes or the state changes
+_NEXT_START: Dict[str, Optional[Tuple]] = {"entry": None}
+
+class _StateSnapshot(NamedTuple):
+    signature: Tuple[int, int, int]
+    data: Dict[str, List[Dict]]
+    payload: bytes
+    member_map: Dict[str, Dict]
+    active_schedules: List[Dict]
+
+
+# Parsed state.json kept in memory; reloaded only when the file's signature changes.
+# Data and derived lookups are published together as one snapshot in a single assignment,
+# so a reader never pairs one state's data with another state's signature or maps.
+_STATE_CACHE: Dict[str, Optional[_StateSnapshot]] = {"snapshot": None}
+_STATE_LOCK = threading.Lock()
+
+# Round-robin counters are served from memory; /api/shift marks them dirty and a
+# background thread writes rr.json, so the request never waits on the disk
+_RR_STATE: Dict[str, Any] = {"map": None, "dirty": False, "flusher": None}
+_RR_LOCK = threading.Lock()
+_RR_WRITE_LOCK = threading.Lock()
+_RR_FLUSH_EVENT = threading.Event()
 
 # Common timezone abbreviation aliases to canonical IANA zones
 TZ_ALIASES: Dict[str, str] = {
@@ -45,56 +95,270 @@ TZ_ALIASES: Dict[str, str] = {
     "PDT": "America/Los_Angeles",
 }
 
+# Aliases resolved once at import: alias -> (canonical IANA name, ZoneInfo)
+_TZ_ALIAS_ZONES: Dict[str, Tuple[str, ZoneInfo]] = {k: (v, ZoneInfo(v)) for k, v in TZ_ALIASES.items()}
+_TZ_ALIAS_HELP = ", ".join(sorted(TZ_ALIASES.keys()))
+# IANA keys shipped with the system/tzdata, listed once so aliases don't pay a failed zone lookup first
+_IANA_NAMES = frozenset(available_timezones())
+
+
+def _atomic_write(path: Path, payload: bytes) -> os.stat_result:
+    # Write to a temp file, flush it to disk and rename, so a crash never leaves a truncated file;
+    # the directory is synced too so the rename itself survives a power loss.
+    # Returns the written file's stat: the rename keeps its inode, size and mtime.
+    tmp_file = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+        os.replace(tmp_file, path)
+    except BaseException:
+        # Don't leave a partial temp file behind
+        try:
+            tmp_file.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return st
+
 
 def ensure_data_file() -> None:
     DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
     if not DATA_FILE.exists():
         initial_state = {
             "members": [
-                {"id": str(uuid.uuid4()), "name": "Alice"},
-                {"id": str(uuid.uuid4()), "name": "Bob"},
-                {"id": str(uuid.uuid4()), "name": "Charlie"},
+                {"id": uuid.uuid4().hex, "name": "Alice"},
+                {"id": uuid.uuid4().hex, "name": "Bob"},
+                {"id": uuid.uuid4().hex, "name": "Charlie"},
             ],
             "schedules": [],
         }
-        DATA_FILE.write_text(json.dumps(initial_state, indent=2))
+        _atomic_write(DATA_FILE, _json_dumps(initial_state))
+
+
+def _json_loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_default(obj: Any) -> Any:
+    # Match orjson, which emits datetimes as ISO 8601 natively
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_dumps(obj: Any) -> bytes:
+    # Compact output: state.json is machine-read, whitespace only costs encode time and bytes
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def _json_response(payload: Any, status: int = 200) -> Response:
+    # Serialize in one C pass when orjson is available; the stdlib fallback stays compact
+    return Response(_json_dumps(payload), status=status, mimetype="application/json")
+
+
+def _state_file_signature() -> Tuple[int, int, int]:
+    return _stat_signature(DATA_FILE.stat())
+
+
+def _stat_signature(st: os.stat_result) -> Tuple[int, int, int]:
+    # mtime alone can miss a rewrite within the filesystem's timestamp granularity;
+    # size and inode (os.replace installs a new one) catch those
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _make_snapshot(signature: Tuple[int, int, int], data: Dict[str, List[Dict]], payload: bytes) -> _StateSnapshot:
+    return _StateSnapshot(signature, data, payload, _build_member_map(data), _build_active_schedules(data))
+
+
+def _refresh_state_cache() -> _StateSnapshot:
+    # Caller holds _STATE_LOCK. One stat() per request on the hot path; only touch the
+    # directory when the file is missing
+    try:
+        signature = _state_file_signature()
+    except FileNotFoundError:
+        ensure_data_file()
+        signature = _state_file_signature()
+    snapshot = _STATE_CACHE["snapshot"]
+    if snapshot is None or snapshot.signature != signature:
+        payload = DATA_FILE.read_bytes()
+        snapshot = _make_snapshot(signature, _json_loads(payload), payload)
+        _STATE_CACHE["snapshot"] = snapshot
+    return snapshot
+
+
+def _snapshot_of(state: Dict[str, List[Dict]]) -> Optional[_StateSnapshot]:
+    # The snapshot state came from, if it is still the published one; read once so every
+    # field used afterwards belongs to that same snapshot
+    snapshot = _STATE_CACHE["snapshot"]
+    if snapshot is not None and snapshot.data is state:
+        return snapshot
+    return None
 
 
 def load_state() -> Dict[str, List[Dict]]:
-    ensure_data_file()
-    return json.loads(DATA_FILE.read_text())
+    """The shared cached state. Read-only: routes that change state use load_state_for_update()."""
+    with _STATE_LOCK:
+        return _refresh_state_cache().data
+
+
+def load_state_for_update() -> Dict[str, List[Dict]]:
+    # A private copy, parsed again from the cached bytes, so changes only reach the shared
+    # cache through a save_state that actually wrote them
+    with _STATE_LOCK:
+        return _json_loads(_refresh_state_cache().payload)
 
 
 def save_state(state: Dict[str, List[Dict]]) -> None:
-    DATA_FILE.write_text(json.dumps(state, indent=2))
+    with _STATE_LOCK:
+        payload = _json_dumps(state)
+        # A save that changes nothing (e.g. re-setting a flag to its current value) skips the
+        # fsync and rename, as long as the file is still the one the cached bytes came from
+        current = _STATE_CACHE["snapshot"]
+        unchanged = False
+        if current is not None and payload == current.payload:
+            try:
+                unchanged = _state_file_signature() == current.signature
+            except FileNotFoundError:
+                pass
+        if unchanged:
+            return
+        written = _atomic_write(DATA_FILE, payload)
+        # Signature taken from the written file itself, so no second stat() after the rename
+        _STATE_CACHE["snapshot"] = _make_snapshot(_stat_signature(written), state, payload)
 
 
-def get_member_map(state: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+def _build_member_map(state: Dict[str, List[Dict]]) -> Dict[str, Dict]:
     return {m["id"]: m for m in state.get("members", [])}
 
 
-def canonicalize_timezone_name(tz_name: str) -> str:
+def load_rr() -> Dict[str, int]:
+    try:
+        return _json_loads(RR_FILE.read_bytes())
+    except FileNotFoundError:
+        # Older deployments kept the counters inside state.json
+        return dict(load_state().get("rr", {}))
+
+
+def next_rr_index(group_key: str, group_size: int) -> int:
+    """Advance the round-robin counter for an overlap group and return the selected index."""
+    with _RR_LOCK:
+        if _RR_STATE["map"] is None:
+            _RR_STATE["map"] = load_rr()
+        rr_map = _RR_STATE["map"]
+        if group_key not in rr_map:
+            # Keys embed the group's start time, so once a new group begins the old ones never
+            # come back; dropping them keeps rr.json (and each flush) from growing forever
+            rr_map.clear()
+        next_index = (rr_map.get(group_key, -1) + 1) % group_size
+        rr_map[group_key] = next_index
+        _RR_STATE["dirty"] = True
+        if _RR_STATE["flusher"] is None:
+            flusher = threading.Thread(target=_rr_flush_loop, name="rr-flush", daemon=True)
+            _RR_STATE["flusher"] = flusher
+            flusher.start()
+    _RR_FLUSH_EVENT.set()
+    return next_index
+
+
+def flush_rr() -> None:
+    # Serialize under the counter lock, write outside it; bursts of bumps collapse into one write
+    with _RR_WRITE_LOCK:
+        with _RR_LOCK:
+            if not _RR_STATE["dirty"]:
+                return
+            payload = _json_dumps(_RR_STATE["map"])
+            _RR_STATE["dirty"] = False
+        _atomic_write(RR_FILE, payload)
+
+
+def _rr_flush_loop() -> None:
+    while True:
+        _RR_FLUSH_EVENT.wait()
+        _RR_FLUSH_EVENT.clear()
+        try:
+            flush_rr()
+        except Exception as e:
+            logger.error("Failed to persist round-robin counters: %s", e)
+
+
+# Don't lose the last bumps on a clean shutdown
+atexit.register(flush_rr)
+
+
+def _state_signature_of(state: Dict[str, List[Dict]]) -> Optional[Tuple[int, int, int]]:
+    # Only the cached state is known to match what is on disk
+    snapshot = _snapshot_of(state)
+    return snapshot.signature if snapshot is not None else None
+
+
+def get_member_map(state: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+    # The cached state carries a prebuilt map; it is refreshed on every load/save
+    snapshot = _snapshot_of(state)
+    if snapshot is not None:
+        return snapshot.member_map
+    return _build_member_map(state)
+
+
+def _build_active_schedules(state: Dict[str, List[Dict]]) -> List[Dict]:
+    return [s for s in state.get("schedules", []) if s.get("active", True)]
+
+
+def get_active_schedules(state: Dict[str, List[Dict]]) -> List[Dict]:
+    # Event scans skip paused schedules; the cached state keeps them pre-filtered
+    snapshot = _snapshot_of(state)
+    if snapshot is not None:
+        return snapshot.active_schedules
+    return _build_active_schedules(state)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_zoneinfo(name: str) -> ZoneInfo:
+    # Unbounded is safe: failures are not cached, so keys are limited to real tzdata names
+    return ZoneInfo(name)
+
+
+def _canonicalize(tz_name: str) -> Tuple[str, ZoneInfo]:
+    """Resolve a timezone name or alias to (canonical_name, ZoneInfo).
+
+    Only successful lookups are cached; unknown names raise on every call.
+    """
     name = (tz_name or "").strip()
     if not name:
         raise ValueError("Timezone required")
+    return _canonicalize_name(name)
 
-    # Direct IANA name
-    try:
-        ZoneInfo(name)
-        return name
-    except Exception:
-        pass
 
-    # Abbreviation alias
-    alias = name.upper()
-    if alias in TZ_ALIASES:
-        # Validate mapped IANA
-        ZoneInfo(TZ_ALIASES[alias])
-        return TZ_ALIASES[alias]
+@functools.lru_cache(maxsize=512)
+def _canonicalize_name(name: str) -> Tuple[str, ZoneInfo]:
+    # Keyed on the stripped name, so padded variants of one zone share an entry
+    # Abbreviation alias (IANA still wins, so e.g. 'EST' keeps its IANA meaning)
+    alias_zone = _TZ_ALIAS_ZONES.get(name.upper())
+
+    # Direct IANA name; unlisted names (e.g. 'posix/...') are still tried unless they are an alias
+    if alias_zone is None or name in _IANA_NAMES:
+        try:
+            return name, _get_zoneinfo(name)
+        except Exception:
+            pass
+
+    if alias_zone is not None:
+        return alias_zone
 
     raise ValueError(
-        f"Unknown timezone '{tz_name}'. Use IANA (e.g., 'Europe/Berlin', 'America/New_York') "
-        f"or a supported abbreviation: {', '.join(sorted(TZ_ALIASES.keys()))}"
+        f"Unknown timezone '{name}'. Use IANA (e.g., 'Europe/Berlin', 'America/New_York') "
+        f"or a supported abbreviation: {_TZ_ALIAS_HELP}"
     )
 
 
@@ -102,23 +366,43 @@ def get_now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def last_fire_utc(cron_expr: str, tz_name: str, now_utc: datetime) -> Optional[datetime]:
-    tz = ZoneInfo(canonicalize_timezone_name(tz_name))
-    now_local = now_utc.astimezone(tz)
-    itr = croniter(cron_expr, now_local)
-    last_local = itr.get_prev(datetime)
-    return last_local.astimezone(timezone.utc)
+@functools.lru_cache(maxsize=64)
+def _isoformat(dt: Optional[datetime]) -> Optional[str]:
+    # Shift boundaries repeat across polls; format each distinct instant once
+    return dt.isoformat() if dt else None
+
+
+@functools.lru_cache(maxsize=256)
+def _expand_cron(cron_expr: str):
+    # Pure string parsing, so the result only depends on the expression
+    return croniter.expand(cron_expr)
+
+
+class _CachedCroniter(croniter):
+    """croniter that reuses the parsed fields of previously seen expressions."""
 
+    @classmethod
+    def expand(cls, expr_format, hash_id=None):
+        if hash_id:
+            return super().expand(expr_format, hash_id=hash_id)
+        # Shared, not copied: croniter only reads the fields (its _get_next works on a shallow copy
+        # and swaps whole fields), and nth-weekday sets are only merged for a '*' key the parser
+        # never produces
+        return _expand_cron(expr_format)
 
-def next_fire_utc(cron_expr: str, tz_name: str, now_utc: datetime) -> Optional[datetime]:
-    tz = ZoneInfo(canonicalize_timezone_name(tz_name))
-    now_local = now_utc.astimezone(tz)
-    itr = croniter(cron_expr, now_local)
-    next_local = itr.get_next(datetime)
-    return next_local.astimezone(timezone.utc)
 
+def _validate_cron(cron_expr: str, tz: ZoneInfo) -> None:
+    # Parsing (cached) rejects malformed expressions. Only a pinned day-of-month together with a
+    # pinned month (e.g. "0 0 30 2 *") can parse yet never fire, so only those pay a trial get_next.
+    expanded = _expand_cron(cron_expr)[0]
+    if expanded[2] != ["*"] and expanded[3] != ["*"]:
+        _CachedCroniter(cron_expr, datetime.now(tz)).get_next(float)
 
+
+@functools.lru_cache(maxsize=256)
 def _parse_time_of_day(hhmm: str) -> time:
+    # Strict HH:MM on purpose: time.fromisoformat would also accept seconds and other ISO forms.
+    # Schedules only carry a few distinct values, so results are memoized (errors are not).
     hhmm = (hhmm or "").strip()
     if not hhmm:
         raise ValueError("Time value required")
@@ -136,277 +420,458 @@ def _is_range_schedule(s: Dict) -> bool:
     return "start_time" in s and s.get("start_time") is not None
 
 
-def _is_bounded_range_schedule(s: Dict) -> bool:
-    # Range schedule with explicit end time
-    return _is_range_schedule(s) and bool(s.get("end_time"))
+# Oldest start replayed to establish the active set at a window's start
+MAX_LOOKBACK = timedelta(days=8)
+
+# How a schedule's start event interacts with the active set
+MODEL_CRON = "cron"        # exclusive: replaces the active set
+MODEL_OPEN = "open"        # open-ended range, exclusive like cron
+MODEL_BOUNDED = "bounded"  # bounded range, may overlap other bounded ranges and crons
+
+# (timestamp_utc, "start" | "end", schedule, model)
+Event = Tuple[datetime, str, Dict, Optional[str]]
+
+
+def _schedule_model(s: Dict) -> Optional[str]:
+    if _is_range_schedule(s):
+        return MODEL_BOUNDED if s.get("end_time") else MODEL_OPEN
+    if s.get("cron"):
+        return MODEL_CRON
+    return None
+
+
+def _apply_overlap_event(active_by_id: Dict[str, Dict], open_ids: Set[str], kind: str, sched: Dict, model: Optional[str]) -> bool:
+    """Apply one event to an overlapping active set in place; return True if its composition changed."""
+    sid = sched.get("id")
+    if kind == "start":
+        if model == MODEL_CRON or model == MODEL_OPEN:
+            # Exclusive models: cron or open-ended range replaces any active set
+            if len(active_by_id) == 1 and sid in active_by_id:
+                return False
+            active_by_id.clear()
+            open_ids.clear()
+            active_by_id[sid] = sched
+            if model == MODEL_OPEN:
+                open_ids.add(sid)
+            return True
+        if model == MODEL_BOUNDED:
+            # Bounded ranges can overlap, but cannot overlap with open-ended ones
+            changed = bool(open_ids)
+            for rid in open_ids:
+                del active_by_id[rid]
+            open_ids.clear()
+            if sid not in active_by_id:
+                active_by_id[sid] = sched
+                changed = True
+            return changed
+        return False
+    if kind == "end" and sid in active_by_id:
+        del active_by_id[sid]
+        open_ids.discard(sid)
+        return True
+    return False
+
+
+def _cron_fire_times(cron_expr: str, tz: ZoneInfo, window_start_utc: datetime, window_end_utc: datetime) -> Iterator[datetime]:
+    """UTC fire times of a cron: the last one before the window, then every one inside it.
+
+    Lazy, so a caller that stops at the first fire it needs never walks the rest of the window.
+    """
+    window_start_local = window_start_utc.astimezone(tz)
+    # Seed with the last fire before the window (the shift that may still be running)
+    try:
+        seed = _CachedCroniter(cron_expr, window_start_local).get_prev(float)
+    except Exception:
+        seed = None
+    if seed is not None:
+        yield datetime.fromtimestamp(seed, timezone.utc)
+    # croniter_range includes both ends and bounds its search to the window's years;
+    # croniter jumps field-by-field, so sparse expressions take a handful of steps. Float results
+    # are epoch instants, which skips a local -> UTC astimezone per fire, and are checked against
+    # the window end before a datetime is built
+    window_end_ts = window_end_utc.timestamp()
+    try:
+        for next_ts in croniter_range(window_start_local, window_end_utc.astimezone(tz), cron_expr,
+                                      ret_type=float, _croniter=_CachedCroniter):
+            if next_ts >= window_end_ts:
+                break
+            yield datetime.fromtimestamp(next_ts, timezone.utc)
+    except Exception:
+        pass
+
+
+# Spacing of the probes in _utc_offset_table. It must stay below the shortest time a zone
+# takes to change its offset and change it back (a week in current tzdata), so any
+# transition between two probes shows up as differing offsets.
+_OFFSET_PROBE_STEP = timedelta(days=6)
+
 
+@functools.lru_cache(maxsize=64)
+def _utc_offset_table(tz: ZoneInfo, start_utc: datetime, end_utc: datetime) -> Tuple[Tuple[Optional[datetime], timedelta], ...]:
+    """The zone's UTC offsets over the UTC instants [start_utc, end_utc] as (wall_time_from, offset) pairs.
 
-def _is_open_range_schedule(s: Dict) -> bool:
-    # Range schedule without explicit end time
-    return _is_range_schedule(s) and not bool(s.get("end_time"))
+    Wall times are naive local times tagged UTC for arithmetic; the first pair starts at None.
+    Most windows hold a single offset. Transitions are located once, to the second, so local
+    wall times convert by subtraction instead of a zoneinfo lookup each. Memoized so range
+    schedules sharing a zone and window (the common case within one scan) share the table.
+    """
+    offset = start_utc.astimezone(tz).utcoffset()
+    table: List[Tuple[Optional[datetime], timedelta]] = [(None, offset)]
+    lo = start_utc
+    while lo < end_utc:
+        hi = min(lo + _OFFSET_PROBE_STEP, end_utc)
+        if hi.astimezone(tz).utcoffset() == offset:
+            lo = hi
+            continue
+        # Bisect whole seconds for the transition instant
+        a, b = int(lo.timestamp()), int(hi.timestamp())
+        if b < hi.timestamp():
+            b += 1
+        while b - a > 1:
+            mid = (a + b) // 2
+            if datetime.fromtimestamp(mid, timezone.utc).astimezone(tz).utcoffset() == offset:
+                a = mid
+            else:
+                b = mid
+        transition = datetime.fromtimestamp(b, timezone.utc)
+        new_offset = transition.astimezone(tz).utcoffset()
+        # Same resolution as zoneinfo with fold=0: wall times in the gap or the repeated hour
+        # keep the earlier offset until the later of the two wall clocks reaches the transition
+        table.append((transition + max(offset, new_offset), new_offset))
+        offset = new_offset
+        lo = transition
+    return tuple(table)
+
+
+def _wall_to_utc(table: Tuple[Tuple[Optional[datetime], timedelta], ...], wall: datetime) -> datetime:
+    # wall is a local time tagged UTC; pick the offset in effect at it
+    offset = table[0][1]
+    for wall_from, wall_offset in table[1:]:
+        if wall < wall_from:
+            break
+        offset = wall_offset
+    return wall - offset
 
 
-def _generate_events_for_schedule(s: Dict, window_start_utc: datetime, window_end_utc: datetime) -> List[Tuple[datetime, str, Dict]]:
-    events: List[Tuple[datetime, str, Dict]] = []
-    if not s.get("active", True):
+@functools.lru_cache(maxsize=256)
+def _range_spec(tz_name: str, start_time: str, end_time: Optional[str], days: Tuple) -> Optional[Tuple[ZoneInfo, time, Optional[time], int]]:
+    """Resolved (zone, start, end, weekday mask) for a range schedule's raw fields, or None if it cannot fire.
+
+    Keyed on the field values, so each distinct schedule is parsed once rather than on every scan.
+    """
+    try:
+        tz = _canonicalize(tz_name)[1]
+        start_t = _parse_time_of_day(start_time)  # required
+    except Exception:
+        return None
+    end_t: Optional[time] = None
+    if end_time:
+        try:
+            end_t = _parse_time_of_day(end_time)  # optional
+        except Exception:
+            end_t = None
+    # Days are integers Monday=0 .. Sunday=6, folded into a 7-bit mask (bit 0 = Monday)
+    days_mask = 0
+    try:
+        for d in days:
+            d = int(d)
+            if 0 <= d <= 6:
+                days_mask |= 1 << d
+    except Exception:
+        days_mask = 0
+    return tz, start_t, end_t, days_mask
+
+
+def _generate_events_for_schedule(s: Dict, window_start_utc: datetime, window_end_utc: datetime) -> Iterable[Event]:
+    events: List[Event] = []
+    if not s.get("active", True) or not s.get("timezone"):
         return events
+    model = _schedule_model(s)
 
     # Legacy cron-only schedule: only start events; shift ends on next start of any schedule
     if "cron" in s and s.get("cron"):
         try:
-            tz = ZoneInfo(canonicalize_timezone_name(s["timezone"]))
+            tz = _canonicalize(s["timezone"])[1]
         except Exception:
             return events
-        # Start iteration a bit before window start to capture an event that may affect active state
-        start_minus = window_start_utc - timedelta(days=2)
-        base_local = start_minus.astimezone(tz)
-        itr = croniter(s["cron"], base_local)
-        for _ in range(1000):
-            try:
-                next_local = itr.get_next(datetime)
-            except Exception:
-                break
-            next_utc = next_local.astimezone(timezone.utc)
-            if next_utc >= window_end_utc:
-                break
-            events.append((next_utc, "start", s))
-        return events
+        return ((ts, "start", s, model) for ts in _cron_fire_times(s["cron"], tz, window_start_utc, window_end_utc))
 
     # Range-based schedule: start_time, optional end_time, days list, timezone
     if _is_range_schedule(s):
         try:
-            tz = ZoneInfo(canonicalize_timezone_name(s["timezone"]))
+            spec = _range_spec(s["timezone"], s["start_time"], s.get("end_time"), tuple(s.get("days") or ()))
         except Exception:
             return events
-        try:
-            start_t = _parse_time_of_day(s["start_time"])  # required
-        except Exception:
+        if spec is None:
+            return events
+        tz, start_t, end_t, days_mask = spec
+        # No weekday selected: the schedule can never fire, so skip the offset table and day scan
+        if not days_mask:
             return events
-        end_t: Optional[time] = None
-        if s.get("end_time"):
-            try:
-                end_t = _parse_time_of_day(s["end_time"])  # optional
-            except Exception:
-                end_t = None
-        # Days are integers Monday=0 .. Sunday=6
-        try:
-            days = [int(d) for d in (s.get("days") or [])]
-        except Exception:
-            days = []
 
-        # Determine local date range to iterate
-        local_start = (window_start_utc - timedelta(days=2)).astimezone(tz)
+        # Look back only as far as a shift can still be running at window start: bounded shifts last
+        # at most a day, an open-ended one runs until replaced and its weekday recurs within a week
+        lookback = timedelta(days=1) if end_t is not None else timedelta(days=7)
+        # Determine local date range to iterate: every local day whose midnight falls before local_end
+        local_start = (window_start_utc - lookback).astimezone(tz)
         local_end = (window_end_utc + timedelta(days=1)).astimezone(tz)
-        cur_date = datetime(local_start.year, local_start.month, local_start.day, 0, 0, 0, tzinfo=tz)
-        while cur_date < local_end:
-            if cur_date.weekday() in days:
-                start_local = datetime(cur_date.year, cur_date.month, cur_date.day, start_t.hour, start_t.minute, tzinfo=tz)
-                start_utc = start_local.astimezone(timezone.utc)
-                if start_utc < window_end_utc:
-                    events.append((start_utc, "start", s))
-                if end_t is not None:
-                    # If end before start, rolls over to next day
-                    end_day = cur_date
-                    if (end_t.hour, end_t.minute) <= (start_t.hour, start_t.minute):
-                        end_day = cur_date + timedelta(days=1)
-                    end_local = datetime(end_day.year, end_day.month, end_day.day, end_t.hour, end_t.minute, tzinfo=tz)
-                    end_utc = end_local.astimezone(timezone.utc)
-                    if end_utc > window_start_utc and end_utc < window_end_utc + timedelta(days=1):
-                        events.append((end_utc, "end", s))
-            cur_date = cur_date + timedelta(days=1)
+        first_day = local_start.toordinal()
+        stop_day = local_end.toordinal() + (1 if local_end.time() > time.min else 0)
+        # Pick the matching weekdays in one pass over day ordinals (ordinal 1 is a Monday),
+        # so datetimes are only built for days that actually have a shift
+        matching_days = [d for d in range(first_day, stop_day) if days_mask >> ((d + 6) % 7) & 1]
+        # If end before start, rolls over to next day
+        end_day_offset = 1 if end_t is not None and (end_t.hour, end_t.minute) <= (start_t.hour, start_t.minute) else 0
+        end_limit_utc = window_end_utc + timedelta(days=1)
+        # Local wall times map to UTC through the zone's offsets over the window, with a day's
+        # margin on both sides of the local days walked above
+        offsets = _utc_offset_table(tz, window_start_utc - lookback - timedelta(days=2), window_end_utc + timedelta(days=3))
+        for ordinal in matching_days:
+            day = date.fromordinal(ordinal)
+            start_utc = _wall_to_utc(offsets, datetime(day.year, day.month, day.day, start_t.hour, start_t.minute, tzinfo=timezone.utc))
+            if end_t is None:
+                if start_utc < window_start_utc:
+                    # Only the latest start before the window matters; it replaces the earlier ones
+                    events = [(start_utc, "start", s, model)]
+                elif start_utc < window_end_utc:
+                    events.append((start_utc, "start", s, model))
+                continue
+            end_day = date.fromordinal(ordinal + end_day_offset)
+            end_utc = _wall_to_utc(offsets, datetime(end_day.year, end_day.month, end_day.day, end_t.hour, end_t.minute, tzinfo=timezone.utc))
+            # Shifts over before the window are dropped as a pair, so no start is left without its end
+            if end_utc <= window_start_utc:
+                continue
+            if start_utc < window_end_utc:
+                events.append((start_utc, "start", s, model))
+            if end_utc < end_limit_utc:
+                events.append((end_utc, "end", s, model))
         return events
 
     return events
 
 
-def _generate_all_events(state: Dict[str, List[Dict]], window_start_utc: datetime, window_end_utc: datetime) -> List[Tuple[datetime, str, Dict]]:
-    events: List[Tuple[datetime, str, Dict]] = []
-    for s in state.get("schedules", []):
-        try:
-            events.extend(_generate_events_for_schedule(s, window_start_utc, window_end_utc))
-        except Exception as e:
-            logging.warning("Failed to generate events for schedule %s: %s", s.get("id"), e)
-    events.sort(key=lambda e: e[0])
-    return events
+def _safe_schedule_events(s: Dict, window_start_utc: datetime, window_end_utc: datetime) -> Iterable[Event]:
+    try:
+        return _generate_events_for_schedule(s, window_start_utc, window_end_utc)
+    except Exception as e:
+        logger.warning("Failed to generate events for schedule %s: %s", s.get("id"), e)
+        return []
 
 
-def _determine_active_at(state: Dict[str, List[Dict]], at_utc: datetime) -> Tuple[Optional[Dict], Optional[datetime]]:
-    # Generate events around the timestamp and simulate to find the active schedule and its start time
-    window_start = at_utc - timedelta(days=2)
-    window_end = at_utc + timedelta(seconds=1)
-    events = _generate_all_events(state, window_start, window_end)
-    active: Optional[Dict] = None
-    active_started: Optional[datetime] = None
-    for ts, kind, sched in events:
-        if ts > at_utc:
-            break
-        if kind == "start":
-            active = sched
-            active_started = ts
-        elif kind == "end":
-            # Only end the schedule if it is currently active
-            if active and active.get("id") == sched.get("id"):
-                active = None
-                active_started = None
-    return active, active_started
+def _iter_all_events(state: Dict[str, List[Dict]], window_start_utc: datetime, window_end_utc: datetime) -> Iterator[Event]:
+    """Chronological events for [window_start_utc, window_end_utc), preceded by what is needed to
+    know the active set at window start.
 
+    Each cron and open-ended range contributes its last start before the window. Bounded ranges
+    are replayed back to the oldest of those starts (at most MAX_LOOKBACK), since a bounded shift
+    in between still ends an open-ended one.
+    """
+    per_schedule: List[Iterable[Event]] = []
+    bounded: List[Tuple[int, Dict]] = []
+    history_start = window_start_utc - timedelta(days=1)
+    oldest_allowed = window_start_utc - MAX_LOOKBACK
+    for s in get_active_schedules(state):
+        if _schedule_model(s) == MODEL_BOUNDED:
+            # Filled in below, keeping schedule order for ties in the merge
+            bounded.append((len(per_schedule), s))
+            per_schedule.append([])
+            continue
+        # Cron streams are lazy: peek at the seed only, then put it back in front
+        events = iter(_safe_schedule_events(s, window_start_utc, window_end_utc))
+        first = next(events, None)
+        if first is None:
+            continue
+        if first[0] < history_start:
+            history_start = max(first[0], oldest_allowed)
+        per_schedule.append(itertools.chain((first,), events))
+    for i, s in bounded:
+        per_schedule[i] = _safe_schedule_events(s, history_start, window_end_utc)
+    # Each schedule's events are already chronological, so a K-way merge replaces a full sort.
+    # Like the stable sort it replaces, ties keep schedule order. The merge is lazy, so
+    # callers that stop early never pay for the rest.
+    return heapq.merge(*per_schedule, key=lambda e: e[0])
 
-def _determine_all_active_at(state: Dict[str, List[Dict]], at_utc: datetime) -> Tuple[List[Dict], Optional[datetime]]:
-    """Determine all schedules active at a specific UTC time, allowing overlaps.
 
-    Returns a tuple of (list_of_active_schedules, active_set_started_utc), where
-    active_set_started_utc is when the current composition of the active set last changed.
-    """
-    # Look slightly behind to capture state transitions leading up to this time
-    window_start = at_utc - timedelta(days=2)
-    window_end = at_utc + timedelta(seconds=1)
-    events = _generate_all_events(state, window_start, window_end)
+def _shift_cache_key(state: Dict[str, List[Dict]], now_utc: datetime) -> Optional[Tuple[Tuple[int, int, int], int]]:
+    signature = _state_signature_of(state)
+    if signature is None:
+        return None
+    return signature, int(now_utc.timestamp())
 
-    active_by_id: Dict[str, Dict] = {}
-    last_change: Optional[datetime] = None
 
-    def is_cron_schedule(s: Dict) -> bool:
-        return bool(s.get("cron")) and not _is_range_schedule(s)
+def _fifo_cache_put(cache: Dict, key, value, max_size: int) -> None:
+    with _fifo_cache_lock:
+        while len(cache) >= max_size:
+            del cache[next(iter(cache))]
+        cache[key] = value
 
-    for ts, kind, sched in events:
-        if ts > at_utc:
-            break
-        sid = sched.get("id")
-        if kind == "start":
-            if is_cron_schedule(sched) or _is_open_range_schedule(sched):
-                # Exclusive models: cron or open-ended range replaces any active set
-                if not (len(active_by_id) == 1 and sid in active_by_id):
-                    active_by_id = {sid: sched}
-                    last_change = ts
-            elif _is_bounded_range_schedule(sched):
-                # Bounded ranges can overlap, but cannot overlap with open-ended ones
-                removed_any = False
-                to_remove = [aid for aid, a in active_by_id.items() if _is_open_range_schedule(a)]
-                for rid in to_remove:
-                    del active_by_id[rid]
-                    removed_any = True
-                if sid not in active_by_id:
-                    active_by_id[sid] = sched
-                    removed_any = True
-                if removed_any:
-                    last_change = ts
-        elif kind == "end":
-            if sid in active_by_id:
-                del active_by_id[sid]
-                last_change = ts
 
-    active_list = list(active_by_id.values())
-    # Provide deterministic ordering by member name for stable UI and round-robin
+def _sort_by_member_name(state: Dict[str, List[Dict]], schedules: List[Dict]) -> None:
+    # Deterministic ordering by member name for stable UI and round-robin
     member_map = get_member_map(state)
-    active_list.sort(key=lambda s: (member_map.get(s.get("member_id"), {}).get("name", ""), s.get("id")))
-    return active_list, last_change
+    schedules.sort(key=lambda s: (member_map.get(s.get("member_id"), {}).get("name", ""), s.get("id")))
 
 
-def _find_next_start_after(state: Dict[str, List[Dict]], after_utc: datetime) -> Tuple[Optional[Dict], Optional[datetime]]:
-    window_start = after_utc
-    window_end = after_utc + timedelta(days=7)
-    events = _generate_all_events(state, window_start, window_end)
-    for ts, kind, sched in events:
-        if kind == "start" and ts > after_utc:
-            return sched, ts
-    return None, None
+def _scan_current_shift(state: Dict[str, List[Dict]], now_utc: datetime) -> Tuple:
+    """One pass over the events around now_utc for everything the current-shift views need.
+
+    Returns (current_schedule, started_utc, active_schedules, active_set_started_utc,
+    next_schedule, next_start_utc): the single-active and overlap simulations up to now_utc,
+    then the first start after it. For the cached state the result is memoized per second
+    of wall clock and state.json signature, so polling the UI and the API only scans once.
+    """
+    cache_key = _shift_cache_key(state, now_utc)
+    if cache_key is not None:
+        cached = _shift_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    active: Optional[Dict] = None
+    active_started: Optional[datetime] = None
+    active_by_id: Dict[str, Dict] = {}
+    open_ids: Set[str] = set()
+    last_change: Optional[datetime] = None
+    next_schedule: Optional[Dict] = None
+    next_start: Optional[datetime] = None
+    if get_active_schedules(state):
+        # While the remembered next start is still ahead, only the current state is needed,
+        # so the week-long horizon is not generated
+        signature = _state_signature_of(state)
+        known_next = _NEXT_START["entry"]
+        if known_next is not None and (signature is None or known_next[0] != signature or not (known_next[1] <= now_utc < known_next[3])):
+            known_next = None
+        horizon = timedelta(seconds=1) if known_next is not None else timedelta(days=7)
+        # One iterator: replay up to now, then keep reading the same merge for the next start,
+        # so nothing past that start is generated
+        events = _iter_all_events(state, now_utc, now_utc + horizon)
+        upcoming: List[Event] = []
+        for event in events:
+            ts, kind, sched, model = event
+            if ts > now_utc:
+                upcoming.append(event)
+                break
+            # Single-active view: any start takes over, an end only clears its own schedule;
+            # the overlap view follows _apply_overlap_event
+            if kind == "start":
+                active = sched
+                active_started = ts
+            elif active and active.get("id") == sched.get("id"):
+                active = None
+                active_started = None
+            if _apply_overlap_event(active_by_id, open_ids, kind, sched, model):
+                last_change = ts
+        if known_next is not None:
+            next_schedule, next_start = known_next[2], known_next[3]
+        else:
+            for ts, kind, sched, _model in itertools.chain(upcoming, events):
+                if kind == "start":
+                    next_schedule, next_start = sched, ts
+                    break
+            if next_start is not None and signature is not None:
+                _NEXT_START["entry"] = (signature, now_utc, next_schedule, next_start)
+
+    active_list = list(active_by_id.values())
+    _sort_by_member_name(state, active_list)
+    result = (active, active_started, active_list, last_change, next_schedule, next_start)
+    if cache_key is not None:
+        _fifo_cache_put(_shift_cache, cache_key, result, SHIFT_CACHE_SIZE)
+    return result
 
 
 def compute_current_shift(state: Dict[str, List[Dict]], now_utc: Optional[datetime] = None) -> Tuple[Optional[Dict], Optional[datetime], Optional[Dict], Optional[datetime]]:
+    """Return (current_schedule, started_utc, next_schedule, next_start_utc)."""
     if now_utc is None:
         now_utc = get_now_utc()
-
-    schedules: List[Dict] = [s for s in state.get("schedules", []) if s.get("active", True)]
-    if not schedules:
-        return None, None, None, None
-
-    current_schedule, current_started_utc = _determine_active_at(state, now_utc)
-    next_schedule, next_start_utc = _find_next_start_after(state, now_utc)
+    current_schedule, current_started_utc, _active, _active_started, next_schedule, next_start_utc = _scan_current_shift(state, now_utc)
     return current_schedule, current_started_utc, next_schedule, next_start_utc
 
 
 def compute_current_overlaps(state: Dict[str, List[Dict]], now_utc: Optional[datetime] = None) -> Tuple[List[Dict], Optional[datetime]]:
     if now_utc is None:
         now_utc = get_now_utc()
-    active_schedules, active_started = _determine_all_active_at(state, now_utc)
+    _current, _started, active_schedules, active_started, _next, _next_start = _scan_current_shift(state, now_utc)
     return active_schedules, active_started
 
 
+def _append_segment(segments: List[Dict], start_utc: datetime, end_utc: datetime, schedules: List[Dict]) -> None:
+    # A segment with the same schedules as the one before it (e.g. a cron replacing itself)
+    # just extends that one
+    if segments:
+        last = segments[-1]
+        if last["end_utc"] == start_utc and {id(x) for x in last["schedules"]} == {id(x) for x in schedules}:
+            last["end_utc"] = end_utc
+            return
+    segments.append({"start_utc": start_utc, "end_utc": end_utc, "schedules": schedules})
+
+
+def quantize_segments(segments: List[Dict], window_start_utc: datetime, window_end_utc: datetime, minutes: int) -> List[Dict]:
+    """Snap segment boundaries to the nearest `minutes` slot from window start.
+
+    Segments shorter than half a slot vanish; neighbours left with the same schedules are merged.
+    """
+    slot = timedelta(minutes=minutes)
+    quantized: List[Dict] = []
+    for seg in segments:
+        start = min(window_start_utc + slot * round((seg["start_utc"] - window_start_utc) / slot), window_end_utc)
+        # The window end stays exact even when the day is not a whole number of slots
+        end = window_end_utc if seg["end_utc"] == window_end_utc else min(
+            window_start_utc + slot * round((seg["end_utc"] - window_start_utc) / slot), window_end_utc)
+        # Neighbours share a boundary, so they round to the same instant and no gap opens
+        if start < end:
+            _append_segment(quantized, start, end, seg["schedules"])
+    return quantized
+
+
 def compute_timeline_segments(state: Dict[str, List[Dict]], window_start_utc: datetime, window_end_utc: datetime) -> List[Dict]:
     """Compute continuous segments across the window with possibly multiple active schedules.
 
     Each returned segment is a dict: { start_utc, end_utc, schedules: [schedule, ...] }.
+    Adjacent segments never share the same set of schedules; such runs are merged.
     """
-    schedules: List[Dict] = [s for s in state.get("schedules", []) if s.get("active", True)]
+    schedules = get_active_schedules(state)
     if not schedules:
         return []
 
-    # Fetch events and establish initial active set at window start
-    events = _generate_all_events(state, window_start_utc - timedelta(days=2), window_end_utc)
-
+    # One pass: events before the window only establish the active set at window start,
+    # events inside it also close the segment running up to them. The per-schedule streams are
+    # consumed straight from the lazy merge, so the tail past the window is never merged
     active_by_id: Dict[str, Dict] = {}
-    def is_cron_schedule(s: Dict) -> bool:
-        return bool(s.get("cron")) and not _is_range_schedule(s)
-
-    for ts, kind, sched in events:
-        if ts >= window_start_utc:
-            break
-        sid = sched.get("id")
-        if kind == "start":
-            if is_cron_schedule(sched) or _is_open_range_schedule(sched):
-                # Exclusive: cron or open-ended range
-                active_by_id = {sid: sched}
-            elif _is_bounded_range_schedule(sched):
-                # Bounded ranges can overlap; remove any open-ended ones
-                to_remove = [aid for aid, a in active_by_id.items() if _is_open_range_schedule(a)]
-                for rid in to_remove:
-                    del active_by_id[rid]
-                active_by_id[sid] = sched
-        elif kind == "end":
-            if sid in active_by_id:
-                del active_by_id[sid]
-
+    open_ids: Set[str] = set()
     segments: List[Dict] = []
     prev_time = window_start_utc
-    for ts, kind, sched in events:
-        if ts < window_start_utc:
-            continue
+    for ts, kind, sched, model in _iter_all_events(state, window_start_utc, window_end_utc):
         if ts >= window_end_utc:
             break
         if prev_time < ts:
-            segments.append({
-                "start_utc": prev_time,
-                "end_utc": ts,
-                "schedules": list(active_by_id.values()),
-            })
-        sid = sched.get("id")
-        if kind == "start":
-            if is_cron_schedule(sched) or _is_open_range_schedule(sched):
-                active_by_id = {sid: sched}
-            elif _is_bounded_range_schedule(sched):
-                to_remove = [aid for aid, a in active_by_id.items() if _is_open_range_schedule(a)]
-                for rid in to_remove:
-                    del active_by_id[rid]
-                active_by_id[sid] = sched
-        elif kind == "end":
-            if sid in active_by_id:
-                del active_by_id[sid]
-        prev_time = ts
+            _append_segment(segments, prev_time, ts, list(active_by_id.values()))
+            prev_time = ts
+        _apply_overlap_event(active_by_id, open_ids, kind, sched, model)
 
     if prev_time < window_end_utc:
-        segments.append({
-            "start_utc": prev_time,
-            "end_utc": window_end_utc,
-            "schedules": list(active_by_id.values()),
-        })
+        _append_segment(segments, prev_time, window_end_utc, list(active_by_id.values()))
 
     # Sort schedules within each segment deterministically by member name
-    member_map = get_member_map(state)
     for seg in segments:
-        seg["schedules"].sort(key=lambda s: (member_map.get(s.get("member_id"), {}).get("name", ""), s.get("id")))
+        _sort_by_member_name(state, seg["schedules"])
     return segments
 
 
+def _member_insert_index(members: List[Dict], name: str) -> int:
+    """Binary-search the position for `name` in members kept sorted case-insensitively.
+
+    Equal names go after existing ones, matching a stable re-sort.
+    """
+    key = name.lower()
+    lo, hi = 0, len(members)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key < members[mid]["name"].lower():
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
 @app.route("/")
 def index():
     state = load_state()
@@ -414,8 +879,10 @@ def index():
     schedules = state.get("schedules", [])
 
     # Overlapping-aware current members
-    current_schedules, current_started_utc = compute_current_overlaps(state)
-    current_schedule, _single_started, next_schedule, next_start_utc = compute_current_shift(state)
+    # One "now" for both so they share the same generated events
+    now_utc = get_now_utc()
+    current_schedules, current_started_utc = compute_current_overlaps(state, now_utc)
+    current_schedule, _single_started, next_schedule, next_start_utc = compute_current_shift(state, now_utc)
     member_map = get_member_map(state)
 
     current_members = [member_map.get(s.get("member_id")) for s in current_schedules]
@@ -425,6 +892,7 @@ def index():
     return render_template(
         "index.html",
         members=members,
+        member_map=member_map,
         schedules=schedules,
         current_member=current_member,
         current_members=current_members,
@@ -438,69 +906,80 @@ def index():
 @app.route("/api/current_shift", methods=["GET"])
 def api_current_shift():
     state = load_state()
-    current_schedules, current_started_utc = compute_current_overlaps(state)
-    current_schedule, _single_started_utc, next_schedule, next_start_utc = compute_current_shift(state)
+    # One "now" for both so they share the same generated events
+    now_utc = get_now_utc()
+    current_schedules, current_started_utc = compute_current_overlaps(state, now_utc)
+    current_schedule, _single_started_utc, next_schedule, next_start_utc = compute_current_shift(state, now_utc)
     member_map = get_member_map(state)
     current_member = member_map.get(current_schedule["member_id"]) if current_schedule else None
     current_members = [member_map.get(s.get("member_id")) for s in current_schedules]
     next_member = member_map.get(next_schedule["member_id"]) if next_schedule else None
 
-    return jsonify({
+    return _json_response({
         "current": {
             "member": current_member,
             "members": current_members,
-            "started_utc": current_started_utc.isoformat() if current_started_utc else None
+            "started_utc": _isoformat(current_started_utc)
         },
         "next": {
             "member": next_member,
-            "start_utc": next_start_utc.isoformat() if next_start_utc else None
+            "start_utc": _isoformat(next_start_utc)
         }
     })
 
 
 @app.route("/members/add", methods=["POST"])
 def add_member():
-    state = load_state()
+    state = load_state_for_update()
     name = request.form.get("name", "").strip()
     if not name:
         return "Name required", 400
-    new_member = {"id": str(uuid.uuid4()), "name": name}
-    state["members"].append(new_member)
-    state["members"] = sorted(state["members"], key=lambda m: m["name"].lower())
+    new_member = {"id": uuid.uuid4().hex, "name": name}
+    members = state["members"]
+    members.insert(_member_insert_index(members, name), new_member)
     save_state(state)
-    logging.info("Added member: %s", name)
+    logger.info("Added member: %s", name)
     # Redirect with hint to preselect in Add Schedule form
     return redirect(url_for("index", new_member_id=new_member["id"]))
 
 
 @app.route("/members/delete/<member_id>", methods=["POST"])
 def delete_member(member_id: str):
-    state = load_state()
-    state["members"] = [m for m in state["members"] if m["id"] != member_id]
-    state["schedules"] = [s for s in state["schedules"] if s["member_id"] != member_id]
+    state = load_state_for_update()
+    members = state["members"]
+    schedules = state["schedules"]
+    kept_members = [m for m in members if m["id"] != member_id]
+    kept = [s for s in schedules if s["member_id"] != member_id]
+    # Nothing to rewrite for an unknown member without orphaned schedules
+    if len(kept_members) == len(members) and len(kept) == len(schedules):
+        return redirect(url_for("index"))
+    state["members"] = kept_members
+    state["schedules"] = kept
     save_state(state)
-    logging.info("Deleted member: %s", member_id)
+    logger.info("Deleted member: %s", member_id)
     return redirect(url_for("index"))
 
 
 @app.route("/schedule/add", methods=["POST"])
 def add_schedule():
-    state = load_state()
-    timezone_name = request.form.get("timezone", "UTC").strip() or "UTC"
-    member_id = request.form.get("member_id", "").strip()
+    state = load_state_for_update()
+    # Every `request.` access goes through the context-local proxy; resolve the form once
+    form = request.form
+    timezone_name = form.get("timezone", "UTC").strip() or "UTC"
+    member_id = form.get("member_id", "").strip()
 
     if not member_id:
         return "member_id required", 400
 
     try:
-        canonical_tz = canonicalize_timezone_name(timezone_name)
+        canonical_tz, tz = _canonicalize(timezone_name)
     except Exception as e:
         return f"Invalid timezone: {e}", 400
 
     # New range-based inputs
-    start_time = (request.form.get("start_time") or "").strip()
-    end_time = (request.form.get("end_time") or "").strip()
-    days = request.form.getlist("days")  # list of strings like ["0", "1", ...]
+    start_time = (form.get("start_time") or "").strip()
+    end_time = (form.get("end_time") or "").strip()
+    days = form.getlist("days")  # list of strings like ["0", "1", ...]
 
     if start_time:
         # Range-based schedule
@@ -519,7 +998,7 @@ def add_schedule():
             return "Invalid days; must be integers 0=Mon .. 6=Sun", 400
 
         new_schedule = {
-            "id": str(uuid.uuid4()),
+            "id": uuid.uuid4().hex,
             "member_id": member_id,
             "start_time": start_time,
             "end_time": end_time or None,
@@ -529,20 +1008,20 @@ def add_schedule():
         }
         state["schedules"].append(new_schedule)
         save_state(state)
-        logging.info("Added range schedule: %s %s-%s (%s) days=%s", member_id, start_time, end_time or "", canonical_tz, days_int)
+        logger.info("Added range schedule: %s %s-%s (%s) days=%s", member_id, start_time, end_time or "", canonical_tz, days_int)
         return redirect(url_for("index"))
 
     # Fallback for legacy cron input (still supported if provided by API or older UI)
-    cron = request.form.get("cron", "").strip()
+    cron = form.get("cron", "").strip()
     if not cron:
         return "start_time or cron required", 400
     try:
-        _ = next_fire_utc(cron, canonical_tz, get_now_utc())
+        _validate_cron(cron, tz)
     except Exception as e:
         return f"Invalid cron: {e}", 400
 
     new_schedule = {
-        "id": str(uuid.uuid4()),
+        "id": uuid.uuid4().hex,
         "member_id": member_id,
         "cron": cron,
         "timezone": canonical_tz,
@@ -550,31 +1029,38 @@ def add_schedule():
     }
     state["schedules"].append(new_schedule)
     save_state(state)
-    logging.info("Added cron schedule: %s (%s)", cron, canonical_tz)
+    logger.info("Added cron schedule: %s (%s)", cron, canonical_tz)
     return redirect(url_for("index"))
 
 
 @app.route("/schedule/delete/<schedule_id>", methods=["POST"])
 def delete_schedule(schedule_id: str):
-    state = load_state()
-    state["schedules"] = [s for s in state["schedules"] if s["id"] != schedule_id]
-    save_state(state)
-    logging.info("Deleted schedule: %s", schedule_id)
+    state = load_state_for_update()
+    schedules = state["schedules"]
+    kept = [s for s in schedules if s["id"] != schedule_id]
+    # Filtering rather than remove() keeps a repeated delete (e.g. a double submit) harmless
+    if len(kept) != len(schedules):
+        state["schedules"] = kept
+        save_state(state)
+        logger.info("Deleted schedule: %s", schedule_id)
     return redirect(url_for("index"))
 
 
 @app.route("/schedule/delete", methods=["POST"])
 def delete_schedules_bulk():
     """Bulk delete schedules from a list of ids in form field 'schedule_ids'."""
-    state = load_state()
-    ids = request.form.getlist("schedule_ids")
+    state = load_state_for_update()
+    ids = set(request.form.getlist("schedule_ids"))
     if not ids:
         return redirect(url_for("index"))
-    before = len(state.get("schedules", []))
-    state["schedules"] = [s for s in state.get("schedules", []) if s.get("id") not in ids]
+    schedules = state.get("schedules", [])
+    kept = [s for s in schedules if s.get("id") not in ids]
+    # Unknown ids (e.g. a stale form) leave nothing to rewrite
+    if len(kept) == len(schedules):
+        return redirect(url_for("index"))
+    state["schedules"] = kept
     save_state(state)
-    after = len(state.get("schedules", []))
-    logging.info("Bulk deleted %d schedules", before - after)
+    logger.info("Bulk deleted %d schedules", len(schedules) - len(kept))
     return redirect(url_for("index"))
 
 
@@ -583,33 +1069,30 @@ def set_schedule_active(schedule_id: str):
     """Set a schedule's active flag from form field 'active' ("true"/"false" or on/off).
     Returns JSON for fetch-based UI or redirects for graceful fallback.
     """
-    state = load_state()
+    state = load_state_for_update()
     active_param = (request.form.get("active") or request.args.get("active") or "").strip().lower()
     active_value = active_param in ("1", "true", "on", "yes")
 
-    updated = False
-    for s in state.get("schedules", []):
-        if s.get("id") == schedule_id:
-            s["active"] = active_value
-            updated = True
-            break
+    schedule = next((s for s in state["schedules"] if s["id"] == schedule_id), None)
+    updated = schedule is not None
     if updated:
+        schedule["active"] = active_value
         save_state(state)
-        logging.info("Set schedule %s active=%s", schedule_id, active_value)
+        logger.info("Set schedule %s active=%s", schedule_id, active_value)
 
     # If request prefers JSON (fetch), respond JSON; else redirect
     if request.accept_mimetypes.best == "application/json" or request.headers.get("X-Requested-With") == "fetch":
-        return jsonify({"ok": updated, "schedule_id": schedule_id, "active": active_value})
+        return _json_response({"ok": updated, "schedule_id": schedule_id, "active": active_value})
     return redirect(url_for("index"))
 
 @app.route("/api/shift", methods=["GET"])
 def api_shift():
     state = load_state()
     now_utc = get_now_utc()
-    active_schedules, active_set_started = _determine_all_active_at(state, now_utc)
+    active_schedules, active_set_started = compute_current_overlaps(state, now_utc)
     member_map = get_member_map(state)
     if not active_schedules:
-        return jsonify({
+        return _json_response({
             "id": None,
             "name": None,
             "on_shift": False,
@@ -619,7 +1102,7 @@ def api_shift():
     if len(active_schedules) == 1:
         only = active_schedules[0]
         member = member_map.get(only.get("member_id"))
-        return jsonify({
+        return _json_response({
             "id": member.get("id") if member else None,
             "name": member.get("name") if member else None,
             "on_shift": True,
@@ -627,21 +1110,16 @@ def api_shift():
         })
 
     # Round-robin over the overlapping active schedules
-    # Build stable ordering (already sorted by member name in _determine_all_active_at)
+    # Build stable ordering (already sorted by member name in _scan_current_shift)
     group_key_part = "|".join([s.get("id") for s in active_schedules])
     group_time = (active_set_started.isoformat() if active_set_started else "")
     group_key = f"{group_time}|{group_key_part}"
 
-    rr_map = state.get("rr", {})
-    prev_index = rr_map.get(group_key, -1)
-    next_index = (prev_index + 1) % len(active_schedules)
-    rr_map[group_key] = next_index
-    state["rr"] = rr_map
-    save_state(state)
+    next_index = next_rr_index(group_key, len(active_schedules))
 
     selected = active_schedules[next_index]
     member = member_map.get(selected.get("member_id"))
-    return jsonify({
+    return _json_response({
         "id": member.get("id") if member else None,
         "name": member.get("name") if member else None,
         "on_shift": True,
@@ -652,17 +1130,23 @@ def api_shift():
 @app.route("/members/delete", methods=["POST"])
 def delete_members_bulk():
     """Bulk delete members and their schedules. Form field 'member_ids'."""
-    state = load_state()
+    state = load_state_for_update()
     ids = set(request.form.getlist("member_ids"))
     if not ids:
         return redirect(url_for("index"))
-    before_m = len(state.get("members", []))
-    state["members"] = [m for m in state.get("members", []) if m.get("id") not in ids]
+    members = state.get("members", [])
+    schedules = state.get("schedules", [])
+    before_m = len(members)
+    kept_members = [m for m in members if m.get("id") not in ids]
     # Remove schedules belonging to deleted members
-    state["schedules"] = [s for s in state.get("schedules", []) if s.get("member_id") not in ids]
+    kept_schedules = [s for s in schedules if s.get("member_id") not in ids]
+    # Unknown ids (e.g. a stale form) leave nothing to rewrite
+    if len(kept_members) == before_m and len(kept_schedules) == len(schedules):
+        return redirect(url_for("index"))
+    state["members"] = kept_members
+    state["schedules"] = kept_schedules
     save_state(state)
-    after_m = len(state.get("members", []))
-    logging.info("Bulk deleted %d members and their schedules", before_m - after_m)
+    logger.info("Bulk deleted %d members and their schedules", before_m - len(state["members"]))
     return redirect(url_for("index"))
 
 
@@ -673,52 +1157,77 @@ def api_timeline():
     Query params:
       - tz: IANA timezone or supported abbreviation, default 'UTC'
       - date: YYYY-MM-DD in the provided timezone; defaults to today in tz
+      - granularity: optional slot size in minutes, one of TIMELINE_GRANULARITIES, to snap segment boundaries to
     """
     state = load_state()
     tz_param = request.args.get("tz", "UTC").strip() or "UTC"
-    tz_name = canonicalize_timezone_name(tz_param)
-    tz = ZoneInfo(tz_name)
+    tz_name, tz = _canonicalize(tz_param)
 
     # Determine local day
     date_param = request.args.get("date")
     if date_param:
         try:
-            year, month, day = [int(x) for x in date_param.split("-")]
-            local_start = datetime(year, month, day, 0, 0, 0, tzinfo=tz)
-        except Exception:
-            return jsonify({"error": "Invalid date. Use YYYY-MM-DD."}), 400
+            # Python 3.11+ fromisoformat also takes basic (20240305) and week (2024-W10-2) dates
+            if len(date_param) != 10 or date_param[4] != "-" or date_param[7] != "-":
+                raise ValueError(date_param)
+            local_day = date.fromisoformat(date_param)
+        except ValueError:
+            return _json_response({"error": "Invalid date. Use YYYY-MM-DD."}, 400)
     else:
-        now_local = get_now_utc().astimezone(tz)
-        local_start = datetime(now_local.year, now_local.month, now_local.day, 0, 0, 0, tzinfo=tz)
+        local_day = get_now_utc().astimezone(tz).date()
+    local_start = datetime.combine(local_day, time.min, tzinfo=tz)
+
+    granularity = None
+    granularity_param = request.args.get("granularity")
+    if granularity_param:
+        try:
+            granularity = int(granularity_param)
+        except ValueError:
+            pass
+        if granularity not in TIMELINE_GRANULARITIES:
+            return _json_response({"error": f"Invalid granularity. Use one of {_GRANULARITY_HELP} (minutes)."}, 400)
 
     local_end = local_start + timedelta(days=1)
     window_start_utc = local_start.astimezone(timezone.utc)
     window_end_utc = local_end.astimezone(timezone.utc)
 
+    # A day's timeline only changes with the state, so repeated polls reuse the serialized body
+    signature = _state_signature_of(state)
+    cache_key = (tz_name, window_start_utc, window_end_utc, granularity, signature)
+    if signature is not None:
+        body = _timeline_cache.get(cache_key)
+        if body is not None:
+            return Response(body, mimetype="application/json")
+
     segments = compute_timeline_segments(state, window_start_utc, window_end_utc)
+    if granularity is not None:
+        segments = quantize_segments(segments, window_start_utc, window_end_utc, granularity)
     member_map = get_member_map(state)
+    # Segments repeat the same few schedules; resolve each one's JSON once
+    schedule_json = {
+        s.get("id"): {"id": s.get("id"), "member": member_map.get(s.get("member_id"))}
+        for s in get_active_schedules(state)
+    }
 
-    def seg_to_json(seg: Dict) -> Dict:
-        schedules_json: List[Dict] = []
-        for s in seg.get("schedules", []):
-            schedules_json.append({
-                "id": s.get("id"),
-                "member": member_map.get(s.get("member_id")),
-            })
-        return {
-            "start_utc": seg["start_utc"].isoformat(),
-            "end_utc": seg["end_utc"].isoformat(),
-            "schedules": schedules_json,
-        }
-
-    return jsonify({
+    # Datetimes go to the serializer as-is; it writes them as ISO 8601
+    response = _json_response({
         "window": {
             "tz": tz_name,
-            "start_utc": window_start_utc.isoformat(),
-            "end_utc": window_end_utc.isoformat(),
+            "start_utc": window_start_utc,
+            "end_utc": window_end_utc,
         },
-        "segments": [seg_to_json(seg) for seg in segments]
+        "segments": [
+            {
+                "start_utc": seg["start_utc"],
+                "end_utc": seg["end_utc"],
+                "schedules": [schedule_json[s.get("id")] for s in seg["schedules"]],
+            }
+            for seg in segments
+        ],
     })
+    if signature is not None:
+        _fifo_cache_put(_timeline_cache, cache_key, response.get_data(), TIMELINE_CACHE_SIZE)
+    return response
 
 
 if __name__ == "__main__":
@@ -0,0 +1,6 @@
+# Production entry point: gunicorn --workers 1 --threads 8 --bind 0.0.0.0:5000 wsgi:app
+# Keep a single worker process. Round-robin counters and the state/timeline caches live in
+# process memory, so several workers would hand out rotations independently.
+from app import app
+
+__all__ = ["app"]